@@ -9,12 +9,14 @@ and analyzes performance by time of day, day of week, and month.
 """
 
 import argparse
-import chess.pgn
-import collections
-from datetime import datetime
-from typing import Optional, Dict, Counter
+import mmap
+from typing import Dict
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; we only write PNGs
 import matplotlib.pyplot as plt
+import numpy as np
 import os
+from numba import njit, types
 
 
 def parse_args() -> argparse.Namespace:
@@ -24,109 +26,284 @@ def parse_args() -> argparse.Namespace:
     return p.parse_args()
 
 
-def determine_result_for_user(game: chess.pgn.Game, username: str) -> Optional[str]:
-    """Return 'win', 'loss', or 'draw' for the user, or None if not playing."""
-    white = game.headers.get("White", "").lower()
-    black = game.headers.get("Black", "").lower()
-    result = game.headers.get("Result", "")
-    user_lower = username.lower()
-
-    if white == user_lower:
-        if result == "1-0":
-            return "win"
-        elif result == "0-1":
-            return "loss"
-        elif result == "1/2-1/2":
-            return "draw"
-    elif black == user_lower:
-        if result == "0-1":
-            return "win"
-        elif result == "1-0":
-            return "loss"
-        elif result == "1/2-1/2":
-            return "draw"
-    return None  # User not in this game
-
-
-def parse_datetime(game: chess.pgn.Game) -> Optional[datetime]:
-    """Parse date and time from PGN headers."""
-    date_str = game.headers.get("UTCDate", game.headers.get("Date", ""))
-    time_str = game.headers.get("UTCTime", game.headers.get("Time", ""))
-    try:
-        if time_str:
-            dt_str = f"{date_str} {time_str}"
-            return datetime.strptime(dt_str, "%Y.%m.%d %H:%M:%S")
+# ── Byte-level PGN header scanner, JIT-compiled with Numba ──────────
+#
+# The hot loop is pure byte comparisons over the seven header tags we
+# care about (White, Black, Result, UTCDate, UTCTime, Date, Time), so
+# it runs entirely in native code over a uint8 view of the file.
+
+_TAG_WHITE = np.frombuffer(b"White", np.uint8)
+_TAG_BLACK = np.frombuffer(b"Black", np.uint8)
+_TAG_RESULT = np.frombuffer(b"Result", np.uint8)
+_TAG_UTCDATE = np.frombuffer(b"UTCDate", np.uint8)
+_TAG_UTCTIME = np.frombuffer(b"UTCTime", np.uint8)
+_TAG_DATE = np.frombuffer(b"Date", np.uint8)
+_TAG_TIME = np.frombuffer(b"Time", np.uint8)
+
+_RES_WHITE_WON = np.frombuffer(b"1-0", np.uint8)
+_RES_BLACK_WON = np.frombuffer(b"0-1", np.uint8)
+_RES_DRAW = np.frombuffer(b"1/2-1/2", np.uint8)
+
+# Sakamoto's day-of-week month offsets (result: 0=Sunday .. 6=Saturday)
+_DOW_OFFSETS = np.array([0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4], np.int64)
+
+
+@njit(cache=True)
+def _eq(buf, start, end, pat):
+    """Compare buf[start:end] against a pattern array."""
+    if end - start != pat.size:
+        return False
+    for k in range(pat.size):
+        if buf[start + k] != pat[k]:
+            return False
+    return True
+
+
+@njit(cache=True)
+def _eq_lower(buf, start, end, pat):
+    """Case-insensitive compare of buf[start:end] against a lowercased pattern."""
+    if end - start != pat.size:
+        return False
+    for k in range(pat.size):
+        c = buf[start + k]
+        if 65 <= c <= 90:  # 'A'-'Z'
+            c += 32
+        if c != pat[k]:
+            return False
+    return True
+
+
+@njit(cache=True)
+def _parse_int(buf, start, end):
+    """Parse a run of ASCII digits; -1 if any byte is not a digit."""
+    value = 0
+    for k in range(start, end):
+        c = buf[k]
+        if c < 48 or c > 57:
+            return -1
+        value = value * 10 + (c - 48)
+    return value
+
+
+@njit(cache=True)
+def _parse_date(buf, start, end):
+    """Parse 'YYYY.MM.DD'; returns (ok, year, month, day)."""
+    if end - start != 10 or buf[start + 4] != 46 or buf[start + 7] != 46:
+        return False, 0, 0, 0
+    year = _parse_int(buf, start, start + 4)
+    month = _parse_int(buf, start + 5, start + 7)
+    day = _parse_int(buf, start + 8, start + 10)
+    if year < 0 or month < 1 or month > 12 or day < 1 or day > 31:
+        return False, 0, 0, 0
+    return True, year, month, day
+
+
+@njit(cache=True)
+def _parse_hour(buf, start, end):
+    """Parse 'HH:MM:SS'; returns (ok, hour)."""
+    if end - start != 8 or buf[start + 2] != 58 or buf[start + 5] != 58:
+        return False, 0
+    hour = _parse_int(buf, start, start + 2)
+    minute = _parse_int(buf, start + 3, start + 5)
+    second = _parse_int(buf, start + 6, start + 8)
+    if hour < 0 or hour > 23 or minute < 0 or minute > 59 or second < 0 or second > 59:
+        return False, 0
+    return True, hour
+
+
+@njit(cache=True)
+def _weekday(year, month, day):
+    """Day of week via Sakamoto's algorithm, datetime convention (0=Monday)."""
+    y = year - 1 if month < 3 else year
+    dow = (y + y // 4 - y // 100 + y // 400 + _DOW_OFFSETS[month - 1] + day) % 7
+    return (dow + 6) % 7  # Sunday-first -> Monday-first
+
+
+_U8_RO = types.Array(types.uint8, 1, "C", readonly=True)
+_SCAN_SIG = types.void(
+    _U8_RO, _U8_RO,
+    types.int64[::1], types.int64[::1], types.int64[::1], types.int64[::1],
+    types.int64[::1], types.int64[::1], types.int64[::1],
+)
+
+
+@njit(_SCAN_SIG, cache=True)
+def _scan_pgn(buf, user, hour_wins, hour_totals, weekday_wins, weekday_totals,
+              month_wins, month_totals, result_counts):
+    """Scan the raw PGN bytes, bucketing results into the given arrays.
+
+    result_counts is indexed 0=win, 1=loss, 2=draw for the user. Games
+    the user is not in, and games with an unparseable date, are handled
+    the same way the old dict-based code did (skipped / counted but not
+    bucketed respectively).
+    """
+    n = buf.size
+    i = 0
+    while i < n:
+        # Per-game state
+        is_white_user = False
+        is_black_user = False
+        res = -1  # 0='1-0', 1='0-1', 2=draw
+        utc_date_seen = False
+        date_seen = False
+        utc_date_ok = False
+        date_ok = False
+        u_year = u_month = u_day = 0
+        p_year = p_month = p_day = 0
+        utc_time_seen = False
+        time_seen = False
+        utc_time_ok = False
+        time_ok = False
+        u_hour = p_hour = 0
+        seen_tag = False
+        in_movetext = False
+
+        # Consume one game: its tag block, then its movetext
+        while i < n:
+            # Locate and strip the current line
+            j = i
+            while j < n and buf[j] != 10:  # '\n'
+                j += 1
+            s = i
+            while s < j and (buf[s] == 32 or buf[s] == 9 or buf[s] == 13):
+                s += 1
+            e = j
+            while e > s and (buf[e - 1] == 32 or buf[e - 1] == 9 or buf[e - 1] == 13):
+                e -= 1
+
+            if s < e and buf[s] == 91:  # '[' tag line
+                if in_movetext:
+                    break  # Next game starts here; do not consume the line
+                # Tag name runs to the first space, value sits between quotes
+                t0 = s + 1
+                t1 = t0
+                while t1 < e and buf[t1] != 32:
+                    t1 += 1
+                v0 = t1
+                while v0 < e and buf[v0] != 34:  # '"'
+                    v0 += 1
+                v1 = e
+                while v1 - 1 > v0 and buf[v1 - 1] != 34:
+                    v1 -= 1
+                if v0 < e and v1 - 1 > v0:
+                    a = v0 + 1
+                    b = v1 - 1
+                    seen_tag = True
+                    if _eq(buf, t0, t1, _TAG_WHITE):
+                        is_white_user = _eq_lower(buf, a, b, user)
+                    elif _eq(buf, t0, t1, _TAG_BLACK):
+                        is_black_user = _eq_lower(buf, a, b, user)
+                    elif _eq(buf, t0, t1, _TAG_RESULT):
+                        if _eq(buf, a, b, _RES_WHITE_WON):
+                            res = 0
+                        elif _eq(buf, a, b, _RES_BLACK_WON):
+                            res = 1
+                        elif _eq(buf, a, b, _RES_DRAW):
+                            res = 2
+                    elif _eq(buf, t0, t1, _TAG_UTCDATE):
+                        utc_date_seen = True
+                        utc_date_ok, u_year, u_month, u_day = _parse_date(buf, a, b)
+                    elif _eq(buf, t0, t1, _TAG_UTCTIME):
+                        utc_time_seen = True
+                        utc_time_ok, u_hour = _parse_hour(buf, a, b)
+                    elif _eq(buf, t0, t1, _TAG_DATE):
+                        date_seen = True
+                        date_ok, p_year, p_month, p_day = _parse_date(buf, a, b)
+                    elif _eq(buf, t0, t1, _TAG_TIME):
+                        time_seen = True
+                        time_ok, p_hour = _parse_hour(buf, a, b)
+            elif s < e and seen_tag:
+                in_movetext = True
+
+            i = j + 1
+
+        if not seen_tag:
+            continue
+
+        # Result from the user's point of view (White takes precedence,
+        # matching the old determine_result_for_user)
+        code = -1
+        if is_white_user:
+            code = res
+        elif is_black_user:
+            if res == 0:
+                code = 1
+            elif res == 1:
+                code = 0
+            elif res == 2:
+                code = 2
+        if code < 0:
+            continue
+
+        result_counts[code] += 1
+
+        # UTC date/time preferred, plain Date/Time as fallback; a present
+        # but malformed time invalidates the whole timestamp, as before
+        if utc_date_seen:
+            d_ok, year, month, day = utc_date_ok, u_year, u_month, u_day
+        elif date_seen:
+            d_ok, year, month, day = date_ok, p_year, p_month, p_day
+        else:
+            d_ok = False
+            year = month = day = 0
+        if utc_time_seen:
+            t_seen, t_ok, hour = True, utc_time_ok, u_hour
+        elif time_seen:
+            t_seen, t_ok, hour = True, time_ok, p_hour
         else:
-            return datetime.strptime(date_str, "%Y.%m.%d")
-    except ValueError:
-        return None
+            t_seen, t_ok, hour = False, False, 0
+
+        if d_ok and (t_ok or not t_seen):
+            is_win = 1 if code == 0 else 0
+            h = hour if t_seen else 0
+            hour_totals[h] += 1
+            hour_wins[h] += is_win
+            weekday = _weekday(year, month, day)
+            weekday_totals[weekday] += 1
+            weekday_wins[weekday] += is_win
+            month_totals[month] += 1
+            month_wins[month] += is_win
 
 
 def analyze_games(pgn_file: str, username: str) -> Dict:
     """Analyze the PGN file and return stats."""
-    results: Counter[str] = collections.Counter()
-    hour_stats: Counter[int] = collections.Counter()
-    weekday_stats: Counter[int] = collections.Counter()  # 0=Monday, 6=Sunday
-    month_stats: Counter[int] = collections.Counter()  # 1-12
-
-    with open(pgn_file, "r", encoding="utf-8") as f:
-        while True:
-            game = chess.pgn.read_game(f)
-            if game is None:
-                break
-
-            result = determine_result_for_user(game, username)
-            if result is None:
-                continue  # Skip games not involving the user
-
-            results[result] += 1
-
-            dt = parse_datetime(game)
-            if dt:
-                hour_stats[dt.hour] += 1
-                weekday_stats[dt.weekday()] += 1
-                month_stats[dt.month] += 1
-
-    # Calculate win rates for each category
-    def win_rate(counter: Counter[int], results_per_key: Dict[int, Counter[str]]) -> Dict[int, float]:
-        rates = {}
-        for key in counter:
-            total = sum(results_per_key.get(key, {}).values())
-            wins = results_per_key.get(key, {}).get("win", 0)
-            rates[key] = wins / total if total > 0 else 0
-        return rates
-
-    # But we need results per key, so collect them
-    hour_results: Dict[int, Counter[str]] = collections.defaultdict(collections.Counter)
-    weekday_results: Dict[int, Counter[str]] = collections.defaultdict(collections.Counter)
-    month_results: Dict[int, Counter[str]] = collections.defaultdict(collections.Counter)
-
-    # Re-parse to collect per-key results
-    with open(pgn_file, "r", encoding="utf-8") as f:
-        while True:
-            game = chess.pgn.read_game(f)
-            if game is None:
-                break
-
-            result = determine_result_for_user(game, username)
-            if result is None:
-                continue
-
-            dt = parse_datetime(game)
-            if dt:
-                hour_results[dt.hour][result] += 1
-                weekday_results[dt.weekday()][result] += 1
-                month_results[dt.month][result] += 1
-
-    hour_win_rates = win_rate(hour_stats, hour_results)
-    weekday_win_rates = win_rate(weekday_stats, weekday_results)
-    month_win_rates = win_rate(month_stats, month_results)
+    # Fixed-size win/total counters, filled by the jitted scanner
+    hour_wins = np.zeros(24, np.int64)
+    hour_totals = np.zeros(24, np.int64)
+    weekday_wins = np.zeros(7, np.int64)  # 0=Monday, 6=Sunday
+    weekday_totals = np.zeros(7, np.int64)
+    month_wins = np.zeros(13, np.int64)  # indexed 1-12
+    month_totals = np.zeros(13, np.int64)
+    result_counts = np.zeros(3, np.int64)  # win, loss, draw
+
+    user = np.frombuffer(username.strip().lower().encode("utf-8"), np.uint8)
+
+    # Memory-map the file so the scanner works on kernel-managed pages
+    # instead of a full in-memory copy (mmap rejects empty files)
+    with open(pgn_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _scan_pgn(
+                    np.frombuffer(mm, np.uint8), user,
+                    hour_wins, hour_totals, weekday_wins, weekday_totals,
+                    month_wins, month_totals, result_counts,
+                )
+
+    # Calculate win rates for each category in one vectorized op,
+    # keeping only the buckets that actually saw games
+    def win_rate(wins: np.ndarray, totals: np.ndarray) -> Dict[int, float]:
+        rates = wins / np.maximum(totals, 1)
+        return {int(k): float(rates[k]) for k in np.flatnonzero(totals)}
+
+    hour_win_rates = win_rate(hour_wins, hour_totals)
+    weekday_win_rates = win_rate(weekday_wins, weekday_totals)
+    month_win_rates = win_rate(month_wins, month_totals)
 
     return {
-        "total_games": sum(results.values()),
-        "wins": results["win"],
-        "losses": results["loss"],
-        "draws": results["draw"],
+        "total_games": int(result_counts.sum()),
+        "wins": int(result_counts[0]),
+        "losses": int(result_counts[1]),
+        "draws": int(result_counts[2]),
         "best_hour": max(hour_win_rates, key=hour_win_rates.get, default=None),
         "worst_hour": min(hour_win_rates, key=hour_win_rates.get, default=None),
         "most_productive_weekday": max(weekday_win_rates, key=weekday_win_rates.get, default=None),
@@ -173,55 +350,52 @@ def main() -> int:
     plots_dir = "plots"
     os.makedirs(plots_dir, exist_ok=True)
 
-    # Pie chart for results
+    # Pie chart for results (square figure)
     if stats['total_games'] > 0:
         labels = ['Wins', 'Losses', 'Draws']
         sizes = [stats['wins'], stats['losses'], stats['draws']]
         colors = ['green', 'red', 'gray']
-        plt.figure(figsize=(6, 6))
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
-        plt.title('Game Results')
-        plt.savefig(os.path.join(plots_dir, 'results_pie.png'))
-        plt.close()
+        fig, ax = plt.subplots(figsize=(6, 6))
+        ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=140)
+        ax.set_title('Game Results')
+        fig.savefig(os.path.join(plots_dir, 'results_pie.png'))
+        plt.close(fig)
+
+    # One shared figure for the three bar charts, cleared between plots
+    # so matplotlib only sets up (and tears down) a canvas once
+    fig, ax = plt.subplots(figsize=(10, 5))
+
+    def bar_chart(labels, rates, color, xlabel, title, filename, xticks=None):
+        ax.clear()
+        ax.bar(labels, rates, color=color)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel('Win Rate (%)')
+        ax.set_title(title)
+        if xticks is not None:
+            ax.set_xticks(xticks)
+        fig.savefig(os.path.join(plots_dir, filename))
 
     # Bar chart for hour win rates
     if stats['hour_win_rates']:
         hours = sorted(stats['hour_win_rates'].keys())
         rates = [stats['hour_win_rates'][h] * 100 for h in hours]
-        plt.figure(figsize=(10, 5))
-        plt.bar(hours, rates, color='blue')
-        plt.xlabel('Hour of Day')
-        plt.ylabel('Win Rate (%)')
-        plt.title('Win Rate by Hour')
-        plt.xticks(hours)
-        plt.savefig(os.path.join(plots_dir, 'hour_win_rates.png'))
-        plt.close()
+        bar_chart(hours, rates, 'blue', 'Hour of Day', 'Win Rate by Hour', 'hour_win_rates.png', xticks=hours)
 
     # Bar chart for weekday win rates
     if stats['weekday_win_rates']:
         wds = sorted(stats['weekday_win_rates'].keys())
         wd_labels = [weekdays[wd] for wd in wds]
         rates = [stats['weekday_win_rates'][wd] * 100 for wd in wds]
-        plt.figure(figsize=(10, 5))
-        plt.bar(wd_labels, rates, color='purple')
-        plt.xlabel('Day of Week')
-        plt.ylabel('Win Rate (%)')
-        plt.title('Win Rate by Day of Week')
-        plt.savefig(os.path.join(plots_dir, 'weekday_win_rates.png'))
-        plt.close()
+        bar_chart(wd_labels, rates, 'purple', 'Day of Week', 'Win Rate by Day of Week', 'weekday_win_rates.png')
 
     # Bar chart for month win rates
     if stats['month_win_rates']:
         ms = sorted(stats['month_win_rates'].keys())
         m_labels = [months[m] for m in ms]
         rates = [stats['month_win_rates'][m] * 100 for m in ms]
-        plt.figure(figsize=(10, 5))
-        plt.bar(m_labels, rates, color='orange')
-        plt.xlabel('Month')
-        plt.ylabel('Win Rate (%)')
-        plt.title('Win Rate by Month')
-        plt.savefig(os.path.join(plots_dir, 'month_win_rates.png'))
-        plt.close()
+        bar_chart(m_labels, rates, 'orange', 'Month', 'Win Rate by Month', 'month_win_rates.png')
+
+    plt.close(fig)
 
     print(f"\nVisualizations saved to '{plots_dir}/' directory.")
 
@@ -1,10 +1,10 @@
 from datetime import datetime
+
 from sqlalchemy.orm import Session
 from .db import SessionLocal
 from .utils import fetch_recent_pgns
 from .pgn_analysis import analyze_pgn
-from .crud import create_game, get_game_by_id
-from .models import User
+from .models import Game, User
 
 BOOTSTRAP_GAMES = 5
 
@@ -21,19 +21,26 @@ def bootstrap_analysis(user_id: str):
 
         games = fetch_recent_pgns(user.lichess_username, BOOTSTRAP_GAMES)
 
-        for game_json in games:
-      
-            if get_game_by_id(db, game_json["id"]):
-                continue
+        # One IN query for the dedupe check instead of a SELECT per game
+        ids = [g["id"] for g in games if g["id"]]
+        existing_ids = (
+            {row.id for row in db.query(Game.id).filter(Game.id.in_(ids))}
+            if ids else set()
+        )
+
+        to_analyze = [g for g in games if g["id"] not in existing_ids]
 
-            result = analyze_pgn(
-                pgn=game_json["pgn"],
-                username=user.lichess_username
-            )
+        # Analyze the games one after another: analyze_pgn already fans
+        # each game's positions out across every core, so an extra pool
+        # here would multiply to games x cores Stockfish processes
+        results = [
+            analyze_pgn(g["pgn"], user.lichess_username) for g in to_analyze
+        ]
 
-            create_game(
-                db=db,
-                game_id=game_json["id"],
+        new_games = []
+        for game_json, result in zip(to_analyze, results):
+            new_games.append(Game(
+                id=game_json["id"],
                 user_id=user.id,
                 played_at=datetime.fromtimestamp(game_json["createdAt"] / 1000),
                 mode=result["game_mode"],
@@ -42,8 +49,11 @@ def bootstrap_analysis(user_id: str):
                 blunders=result["blunders"],
                 pushups=result["pushups"],
                 status="forgiven"
-            )
+            ))
 
+        # Single bulk insert + commit instead of one round-trip per game
+        if new_games:
+            db.bulk_save_objects(new_games)
         db.commit()
         print(f"🔥 Bootstrap complete for {user.username}")
 
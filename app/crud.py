@@ -1,6 +1,6 @@
 import uuid
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func
 from .models import User, Game
 
 def username_exists(db: Session, username: str) -> bool:
@@ -8,12 +8,20 @@ def username_exists(db: Session, username: str) -> bool:
 
 
 def suggest_usernames(db: Session, base_username: str, limit: int = 3):
+    # One LIKE query for every taken "<base>_N" name instead of a
+    # SELECT per candidate (the unique index on username covers it)
+    taken = {
+        row.username
+        for row in db.query(User.username)
+        .filter(User.username.like(f"{base_username}\\_%", escape="\\"))
+    }
+
     suggestions = []
     i = 2
 
     while len(suggestions) < limit:
         candidate = f"{base_username}_{i}"
-        if not username_exists(db, candidate):
+        if candidate not in taken:
             suggestions.append(candidate)
         i += 1
 
@@ -43,7 +51,7 @@ def create_game(
     opponent,
     blunders,
     pushups,
-    status
+    status,
 ):
     game = Game(
         id=game_id,
@@ -59,15 +67,13 @@ def create_game(
     db.add(game)
     db.commit()
 
-def get_pushups_due(db, user_id):
-    return db.query(func.coalesce(func.sum(Game.pushups), 0)) \
-        .filter(Game.user_id == user_id, Game.status == "new") \
-        .scalar()
-
-def get_pushups_forgiven(db, user_id):
-    return db.query(func.coalesce(func.sum(Game.pushups), 0)) \
-        .filter(Game.user_id == user_id, Game.status == "forgiven") \
-        .scalar()
+def get_pushup_totals(db, user_id):
+    """Return (pushups_due, pushups_forgiven) in a single query."""
+    row = db.query(
+        func.coalesce(func.sum(case((Game.status == "new", Game.pushups), else_=0)), 0),
+        func.coalesce(func.sum(case((Game.status == "forgiven", Game.pushups), else_=0)), 0),
+    ).filter(Game.user_id == user_id).one()
+    return row[0], row[1]
 
 def get_recent_games(db, user_id, limit=5):
     return db.query(Game) \
@@ -12,7 +12,7 @@ It requests NDJSON (one JSON object per line) and writes both NDJSON and a combi
 from __future__ import annotations
 
 import argparse
-import json
+import orjson
 import os
 import sys
 import time
@@ -36,7 +36,7 @@ def parse_args() -> argparse.Namespace:
 
 def fetch_games(username: str, token: Optional[str], max_games: int, since_ms: Optional[int], timeout: float, user_agent: str):
     url = f"https://lichess.org/api/games/user/{username}"
-    headers = {"Accept": "application/x-ndjson", "User-Agent": user_agent}
+    headers = {"Accept": "application/x-ndjson", "Accept-Encoding": "gzip", "User-Agent": user_agent}
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
@@ -52,7 +52,7 @@ def fetch_games(username: str, token: Optional[str], max_games: int, since_ms: O
             if not line:
                 continue
             try:
-                obj = json.loads(line)
+                obj = orjson.loads(line)
             except Exception:
                 # If parsing fails, yield raw line to allow inspection
                 yield None, line
@@ -83,37 +83,45 @@ def main() -> int:
     ndjson_path = os.path.join(args.output_dir, basefn + ".ndjson")
     json_path = os.path.join(args.output_dir, basefn + ".json")
 
-    games = []
-    raw_lines = []
-    count = 0
+    parsed_count = 0
+    raw_count = 0
     print(f"Fetching up to {args.max} games for user '{args.username}'...")
     try:
-        for obj, raw in fetch_games(args.username, args.token, args.max, since_ms, args.timeout, args.user_agent):
-            if obj is None:
-                raw_lines.append(raw)
-            else:
-                games.append(obj)
-            count += 1
+        # Stream each game straight to disk as it arrives: O(1) memory,
+        # and disk writes overlap the network fetch. The combined JSON
+        # list is emitted with a manual [ / , / ] writer so the games
+        # never need to be buffered.
+        with open(ndjson_path, "wb") as ndjson_f, \
+                open(json_path, "wb") as json_f:
+            json_f.write(b"[\n")
+            for obj, raw in fetch_games(args.username, args.token, args.max, since_ms, args.timeout, args.user_agent):
+                if obj is None:
+                    # Parse failures are preserved in the NDJSON output only
+                    ndjson_f.write(raw.rstrip().encode("utf-8") + b"\n")
+                    raw_count += 1
+                    continue
+                line = orjson.dumps(obj)
+                ndjson_f.write(line + b"\n")
+                if parsed_count:
+                    json_f.write(b",\n")
+                json_f.write(line)
+                parsed_count += 1
+            json_f.write(b"\n]\n")
     except Exception as exc:
         print(f"Error fetching games: {exc}")
+        # A mid-stream failure leaves the combined JSON without its
+        # closing bracket; remove both outputs so a failed run writes
+        # nothing instead of invalid files
+        for path in (ndjson_path, json_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
         return 2
 
-    # Save NDJSON: use original JSON lines if available else dump from parsed objects
-    with open(ndjson_path, "w", encoding="utf-8") as f:
-        # prefer writing parsed objects for consistency
-        for g in games:
-            f.write(json.dumps(g, ensure_ascii=False) + "\n")
-        # append any raw lines that failed to parse
-        for r in raw_lines:
-            f.write(r.rstrip() + "\n")
-
-    # Save combined JSON list
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(games, f, ensure_ascii=False, indent=2)
-
-    print(f"Saved {len(games)} parsed games to: {ndjson_path} and {json_path}")
-    if raw_lines:
-        print(f"Additionally saved {len(raw_lines)} raw lines (parse failures preserved).")
+    print(f"Saved {parsed_count} parsed games to: {ndjson_path} and {json_path}")
+    if raw_count:
+        print(f"Additionally saved {raw_count} raw lines (parse failures preserved).")
     return 0
 
 
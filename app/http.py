@@ -0,0 +1,10 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared session so Lichess calls reuse keep-alive connections instead
+# of paying a fresh TCP+TLS handshake on every request
+SESSION = requests.Session()
+
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
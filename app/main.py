@@ -1,5 +1,10 @@
-from datetime import datetime, timezone
+import asyncio
+import multiprocessing
+import re
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
 import requests
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Body
@@ -7,6 +12,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from psycopg2 import IntegrityError
 
+from .http import SESSION
 from .pgn_analysis import analyze_pgn
 from .bootstrap import bootstrap_analysis
 from .models import User
@@ -15,8 +21,7 @@ from .crud import (
     create_game,
     create_user,
     get_game_by_id,
-    get_pushups_due,
-    get_pushups_forgiven,
+    get_pushup_totals,
     get_recent_games,
     username_exists,
     suggest_usernames,
@@ -37,8 +42,20 @@ app.add_middleware(
 
 LICHESS_API = "https://lichess.org/api/games/user"
 
+# Stockfish analysis is CPU-bound; run it in worker processes so it
+# never blocks the HTTP workers. Two workers are plenty: analyze_pgn
+# already fans each game out across every core internally, so a wider
+# pool here would multiply to cores x cores engine processes under
+# concurrent requests. spawn (not fork) makes each worker re-import
+# pgn_analysis instead of sharing the parent's state.
+CPU_POOL = ProcessPoolExecutor(
+    max_workers=2,
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
 HEADERS = {
     "Accept": "application/x-chess-pgn",
+    "Accept-Encoding": "gzip",  # PGN text compresses ~5-8x; requests decompresses transparently
     "User-Agent": "ChessPushups/1.0 (contact: dev@local)",
 }
 
@@ -47,7 +64,7 @@ HEADERS = {
 # ─────────────────────────────────────────────────────────────
 
 @app.post("/analyze-pgn")
-def analyze_pgn_text(
+async def analyze_pgn_text(
     player: str,
     pgn: str = Body(..., media_type="text/plain"),
 ):
@@ -61,7 +78,9 @@ def analyze_pgn_text(
         raise HTTPException(400, "Player name is required")
 
     try:
-        result = analyze_pgn(pgn_text, player)
+        result = await asyncio.get_running_loop().run_in_executor(
+            CPU_POOL, analyze_pgn, pgn_text, player
+        )
     except ValueError as e:
         raise HTTPException(
             400,
@@ -84,7 +103,7 @@ def analyze_latest_game(username: str, db: Session = Depends(get_db)):
         raise HTTPException(404, "User not found")
 
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{LICHESS_API}/{user.lichess_username}",
             params={"max": 1},
             headers=HEADERS,
@@ -99,12 +118,15 @@ def analyze_latest_game(username: str, db: Session = Depends(get_db)):
     pgn_text = response.text
 
     try:
-        result = analyze_pgn(pgn_text, user.username)
+        # Endpoint runs on a threadpool thread; hand the CPU-bound
+        # analysis to a worker process instead of holding the GIL here
+        result = CPU_POOL.submit(analyze_pgn, pgn_text, user.username).result()
     except ValueError:
         raise HTTPException(204, "No analyzable game yet")
 
-    game_id = extract_game_id(pgn_text) or str(uuid.uuid4())
-    played_at = extract_played_at(pgn_text)
+    # analyze_pgn already parsed the headers; no need to re-scan the PGN
+    game_id = result.get("game_id") or str(uuid.uuid4())
+    played_at = result.get("played_at") or datetime.now(timezone.utc)
 
     if not get_game_by_id(db, game_id):
         create_game(
@@ -180,11 +202,12 @@ def home(username: str, db: Session = Depends(get_db)):
         raise HTTPException(404, "User not found")
 
     games = get_recent_games(db, user.id)
+    pushups_due, pushups_forgiven = get_pushup_totals(db, user.id)
 
     return {
         "username": user.username,
-        "pushups_due": get_pushups_due(db, user.id),
-        "pushups_forgiven": get_pushups_forgiven(db, user.id),
+        "pushups_due": pushups_due,
+        "pushups_forgiven": pushups_forgiven,
         "games": [
             {
                 "game_id": g.id,
@@ -210,33 +233,23 @@ def options_handler(path: str):
 # Helpers
 # ─────────────────────────────────────────────────────────────
 
-def extract_game_id(pgn: str):
-    for line in pgn.splitlines():
-        if line.startswith("[Site "):
-            site = line.split('"')[1]
-            if "/" in site:
-                return site.split("/")[-1]
-    return None
+_TAG_RE = re.compile(r'^\[(\w+) "([^"]*)"', re.M)
 
 
-def extract_played_at(pgn: str):
-    date, time = None, None
+def parse_pgn_headers(pgn: str) -> dict:
+    """Collect all tag pairs from the PGN header block in one pass.
 
-    for line in pgn.splitlines():
-        if line.startswith("[UTCDate "):
-            date = line.split('"')[1]
-        elif line.startswith("[UTCTime "):
-            time = line.split('"')[1]
-
-    if not date or not time:
-        return datetime.now(timezone.utc)
-
-    try:
-        return datetime.strptime(
-            f"{date} {time}", "%Y.%m.%d %H:%M:%S"
-        ).replace(tzinfo=timezone.utc)
-    except Exception:
-        return datetime.now(timezone.utc)
+    The compiled regex walks the text in C instead of splitting it
+    into a line list. Keeping the first occurrence of each tag means
+    only the first game of a multi-game blob is described, matching
+    the old line-scanner behaviour.
+    """
+    headers = {}
+    for m in _TAG_RE.finditer(pgn):
+        key = m.group(1)
+        if key not in headers:
+            headers[key] = m.group(2)
+    return headers
 
 
 def normalize_pgn(pgn: str) -> str:
@@ -262,7 +275,5 @@ def username_from_pgn(pgn: str) -> str:
     Dummy username used internally.
     analyze_pgn only needs this to decide color.
     """
-    for line in pgn.splitlines():
-        if line.startswith("[White "):
-            return line.split('"')[1].strip().lower()
-    return "anonymous"
+    white = parse_pgn_headers(pgn).get("White", "")
+    return white.strip().lower() or "anonymous"
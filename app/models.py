@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -27,4 +27,7 @@ class Game(Base):
     pushups = Column(Integer)
     status = Column(String)  # new | done | forgiven
 
+    # Covers the per-user pushup aggregates on /home
+    __table_args__ = (Index("ix_games_user_id_status", "user_id", "status"),)
+
 
@@ -1,80 +1,257 @@
+import cachetools
 import chess
+import chess.engine
 import chess.pgn
+import chess.polyglot
+import diskcache
 import io
+import multiprocessing
+import os
 import numpy as np
-import math
-from stockfish import Stockfish
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
 
 # ─────────────────────────────────────────────────────────────
 # Configuration
 # ─────────────────────────────────────────────────────────────
-stockfish = Stockfish(
-    path="/usr/local/bin/stockfish",
-    depth=18,
-    parameters={
-        "Threads": 4,
-        "Hash": 512,
-        "MultiPV": 1,  # Only need best move for speed
-        "Skill Level": 20,
-    },
+STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "/usr/local/bin/stockfish")
+DEPTH = int(os.getenv("STOCKFISH_DEPTH", "18"))
+SHALLOW_DEPTH = int(os.getenv("STOCKFISH_SHALLOW_DEPTH", "10"))
+
+# Stable game token so python-chess never sends ucinewgame between
+# analyse() calls (which would clear the transposition table)
+_GAME_TOKEN = object()
+
+
+# Bounded so a long-lived process can't grow them without limit; the
+# disk cache below retains the long tail past eviction
+_CACHE = cachetools.LRUCache(maxsize=200_000)
+_SHALLOW_CACHE = cachetools.LRUCache(maxsize=200_000)
+
+# Full-depth evals persisted across restarts and shared between worker
+# processes; keyed ((zobrist, pov), depth) — the values are normalized
+# to one player's perspective and depend on search depth, so neither a
+# depth change nor the opponent analyzing the same position may ever
+# serve a stale or sign-flipped result. The in-memory _CACHE stays in
+# front as the hot layer.
+DISK_CACHE = diskcache.Cache(
+    os.getenv("BLUNDER_CACHE_DIR", "/tmp/blunder_cache"),
+    size_limit=256 * 1024 * 1024,
 )
 
-_CACHE = {}
+# ─────────────────────────────────────────────────────────────
+# Batched analysis workers
+# ─────────────────────────────────────────────────────────────
+# For many independent positions, N single-threaded engines in
+# parallel beat one N-threaded engine searching sequentially, so the
+# per-ply searches of a game are fanned out to a small process pool.
+
+def _analyse_batch(fens: list, player_is_white: bool, depth: int) -> list:
+    """Search a chunk of positions with a private single-threaded engine.
+
+    The engine is opened and closed inside the task: its background
+    thread is non-daemon, so a worker that still held one open would
+    never exit when the pool shuts down. One engine per chunk keeps
+    the startup cost amortized while consecutive positions of the
+    same game share a warm transposition table.
+    """
+    engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH)
+    try:
+        engine.configure({"Threads": 1, "Hash": 128})
+        results = []
+        for fen in fens:
+            board = chess.Board(fen)
+            terminal = _terminal_eval(board, player_is_white)
+            if terminal is not None:
+                results.append(terminal)
+                continue
+            info = engine.analyse(
+                board, chess.engine.Limit(depth=depth), game=_GAME_TOKEN
+            )
+            score = info["score"].pov(
+                chess.WHITE if player_is_white else chess.BLACK
+            )
+            results.append(_score_to_eval(score, info.get("pv")))
+        return results
+    finally:
+        engine.close()
+
+
+def _run_batch(fens: list, keys: list, player_is_white: bool, depth: int, cache: dict):
+    """Fan independent position searches out across engine workers.
+
+    Contiguous chunks keep neighbouring positions of the game on the
+    same engine (warm transposition table), and the spawn context gives
+    each worker a fresh module. Results land in `cache` under the
+    matching transposition keys.
+    """
+    if not fens:
+        return
+    workers = min(os.cpu_count() or 1, len(fens))
+    step = -(-len(fens) // workers)  # ceil division
+    fen_chunks = [fens[i : i + step] for i in range(0, len(fens), step)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        results = []
+        for chunk_results in pool.map(
+            _analyse_batch, fen_chunks, repeat(player_is_white), repeat(depth)
+        ):
+            results.extend(chunk_results)
+    for key, result in zip(keys, results):
+        cache[key] = result
+        DISK_CACHE.set((key, depth), result)
+
+
+def _disk_get(key, depth):
+    """Disk lookup that ignores entries written under an older eval schema."""
+    hit = DISK_CACHE.get((key, depth))
+    if hit is not None and "pv" not in hit:
+        return None
+    return hit
+
+
+def _position_cached(key) -> bool:
+    """True if a usable eval for this key is in memory or on disk.
+
+    Disk hits are promoted into the matching in-memory cache so the
+    rest of the analysis only ever consults the dicts.
+    """
+    if key in _CACHE or key in _SHALLOW_CACHE:
+        return True
+    hit = _disk_get(key, DEPTH)
+    if hit is not None:
+        _CACHE[key] = hit
+        return True
+    hit = _disk_get(key, SHALLOW_DEPTH)
+    if hit is not None:
+        _SHALLOW_CACHE[key] = hit
+        return True
+    return False
 
 # ─────────────────────────────────────────────────────────────
 # Core Evaluation Utilities
 # ─────────────────────────────────────────────────────────────
+# Win probabilities precomputed for every centipawn value in
+# [-2000, 2000]; beyond that the sigmoid is flat to float precision
+_WINPROB_LUT = 100.0 / (1.0 + np.exp(-0.00368208 * np.arange(-2000, 2001, dtype=np.float32)))
+
+
 def cp_to_winprob(cp: float) -> float:
     """Convert centipawns to win probability (Lichess model)"""
-    return 100 / (1 + math.exp(-0.00368208 * cp))
+    i = int(cp)
+    i = -2000 if i < -2000 else 2000 if i > 2000 else i
+    return float(_WINPROB_LUT[i + 2000])
 
-def get_position_eval(board: chess.Board, player_is_white: bool) -> dict:
-    """Get evaluation from player's perspective"""
-    fen = board.fen()
-    if fen in _CACHE:
-        return _CACHE[fen]
-    
-    stockfish.set_fen_position(fen)
-    eval_dict = stockfish.get_evaluation()
-    
-    # Parse evaluation
-    if eval_dict["type"] == "mate":
-        cp = 10000 if eval_dict["value"] > 0 else -10000
+def _score_to_eval(score: chess.engine.Score, pv) -> dict:
+    """Build the eval dict from a player-POV score and principal variation."""
+    if score.is_mate():
+        cp = 10000 if score.mate() > 0 else -10000
         is_mate = True
-        mate_in = abs(eval_dict["value"])
+        mate_in = abs(score.mate())
     else:
-        cp = eval_dict["value"]
+        cp = score.score()
         is_mate = False
         mate_in = None
-    
-    # Normalize to player perspective
-    is_white_turn = board.turn == chess.WHITE
-    if is_white_turn != player_is_white:
-        cp = -cp
-    
-    # Get best move
-    best_move = stockfish.get_best_move()
-    
-    result = {
+
+    # The PV already holds chess.Move objects; keep the line so callers
+    # never re-parse UCI strings or re-search for a punishment line
+    pv = list(pv) if pv else []
+    best_move_obj = pv[0] if pv else None
+
+    return {
         "cp": cp,
         "winprob": cp_to_winprob(cp),
-        "best_move": best_move,
+        "best_move": best_move_obj.uci() if best_move_obj else None,
+        "best_move_obj": best_move_obj,
+        "pv": pv,
         "is_mate": is_mate,
         "mate_in": mate_in,
     }
-    
-    _CACHE[fen] = result
+
+
+def _terminal_eval(board: chess.Board, player_is_white: bool) -> dict | None:
+    """Eval for game-over positions without touching the engine.
+
+    Searching a position with no legal moves is pure waste; checkmate,
+    stalemate and dead material are decided by python-chess in
+    microseconds.
+    """
+    if board.is_checkmate():
+        player_to_move = board.turn == (chess.WHITE if player_is_white else chess.BLACK)
+        cp = -10000 if player_to_move else 10000
+        return {
+            "cp": cp,
+            "winprob": cp_to_winprob(cp),
+            "best_move": None,
+            "best_move_obj": None,
+            "pv": [],
+            "is_mate": True,
+            "mate_in": 0,
+        }
+    if board.is_stalemate() or board.is_insufficient_material():
+        return {
+            "cp": 0,
+            "winprob": cp_to_winprob(0),
+            "best_move": None,
+            "best_move_obj": None,
+            "pv": [],
+            "is_mate": False,
+            "mate_in": None,
+        }
+    return None
+
+
+def format_eval(cp, is_mate, mate_in):
+    """Render an eval as the familiar +1.50 / -#3 style string."""
+    if is_mate:
+        sign = "" if cp > 0 else "-"
+        return f"{sign}#{mate_in}"
+    sign = "+" if cp >= 0 else "-"
+    return f"{sign}{abs(cp)/100:.2f}"
+
+
+def get_position_eval(board: chess.Board, player_is_white: bool) -> dict:
+    """Get evaluation from player's perspective"""
+    # Zobrist hash instead of FEN: a single 64-bit int, much cheaper
+    # than serializing the position, and it also hits when the same
+    # position arises again by transposition. The POV color is part of
+    # the key because the stored cp/winprob are player-normalized — the
+    # same position must never serve sign-flipped evals to the opponent
+    key = (chess.polyglot.zobrist_hash(board), player_is_white)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    hit = _disk_get(key, DEPTH)
+    if hit is not None:
+        _CACHE[key] = hit
+        return hit
+
+    terminal = _terminal_eval(board, player_is_white)
+    if terminal is not None:
+        _CACHE[key] = terminal
+        return terminal
+
+    # Rare fallback for positions the batch passes didn't cover; a
+    # transient engine keeps the lifecycle airtight — a long-lived one
+    # would hold a non-daemon thread that blocks process exit
+    result = _analyse_batch([board.fen()], player_is_white, DEPTH)[0]
+
+    _CACHE[key] = result
+    DISK_CACHE.set((key, DEPTH), result)
     return result
 
 # ─────────────────────────────────────────────────────────────
 # CRITICAL: Tactical Punishment Detection
 # ─────────────────────────────────────────────────────────────
-def detect_tactical_punishment(board_before: chess.Board, move_played: chess.Move, 
-                               board_after: chess.Board, player_is_white: bool) -> dict:
+def detect_tactical_punishment(board_after: chess.Board, player_is_white: bool) -> dict:
     """
     Detect if the move allows OBVIOUS tactical punishment.
     This is the key to identifying "human-regrettable" moves.
-    
+    Only the post-move position is needed.
+
     Returns:
         {
             "hanging_piece": bool,
@@ -92,138 +269,151 @@ def detect_tactical_punishment(board_before: chess.Board, move_played: chess.Mov
         "is_obvious": False,
     }
     
-    # Check if we hung a piece (undefended piece can be captured)
-    player_pieces = board_after.pieces(chess.PAWN, player_is_white)
-    for piece_type in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
-        player_pieces |= board_after.pieces(piece_type, player_is_white)
-    
-    for square in player_pieces:
-        piece = board_after.piece_at(square)
-        if piece and piece.color == (chess.WHITE if player_is_white else chess.BLACK):
-            # Check if attacked and not defended
-            attackers = board_after.attackers(not player_is_white, square)
-            defenders = board_after.attackers(player_is_white, square)
-            
-            if attackers and not defenders:
-                # Piece is hanging
-                if piece.piece_type in [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]:
-                    punishment["hanging_piece"] = True
-                    punishment["is_obvious"] = True
-                    break
-    
-    # Check opponent's best response for mate threat
-    stockfish.set_fen_position(board_after.fen())
-    opponent_eval = stockfish.get_evaluation()
+    # Check if we hung a piece (undefended piece can be captured).
+    # Pure bitboard arithmetic: union the attack masks of each side
+    # once, then a couple of 64-bit ANDs replace the old per-square
+    # attackers() loop and its SquareSet allocations.
+    valuable = (
+        board_after.knights
+        | board_after.bishops
+        | board_after.rooks
+        | board_after.queens
+    )
+    ours = board_after.occupied_co[player_is_white]
+    theirs = board_after.occupied_co[not player_is_white]
+
+    their_attacks = 0
+    for square in chess.scan_reversed(theirs):
+        their_attacks |= board_after.attacks_mask(square)
+
+    hanging = valuable & ours & their_attacks
+    if hanging:
+        # Only pay for the defence map when something is attacked
+        our_defences = 0
+        for square in chess.scan_reversed(ours):
+            our_defences |= board_after.attacks_mask(square)
+        hanging &= ~our_defences
+
+    if hanging:
+        punishment["hanging_piece"] = True
+        punishment["is_obvious"] = True
     
-    if opponent_eval["type"] == "mate":
-        mate_in = abs(opponent_eval["value"])
+    # Check opponent's best response for mate threat, reusing the
+    # cached post-move analysis instead of a fresh engine search
+    post_eval = get_position_eval(board_after, player_is_white)
+
+    if post_eval["is_mate"]:
+        mate_in = post_eval["mate_in"]
         if mate_in <= 5:  # Mate in 5 or less is obvious threat
             punishment["mate_threat"] = mate_in
             punishment["is_obvious"] = True
-    
+
     # Check if opponent wins material by force (eval > +3)
-    elif opponent_eval["value"] > 300:  # From opponent's perspective
+    elif -post_eval["cp"] > 300:  # From opponent's perspective
         punishment["forced_material_loss"] = True
         punishment["is_obvious"] = True
-    
+
     return punishment
 
 # ─────────────────────────────────────────────────────────────
 # CRITICAL: Blunder Classification Rules
 # ─────────────────────────────────────────────────────────────
-def classify_blunder(regret: float, punishment: dict, game_phase: str, 
-                    pre_eval: float, post_eval: float) -> str | None:
+_SEVERITY_LABELS = (None, "inaccuracy", "mistake", "blunder")
+_NONE, _INACCURACY, _MISTAKE, _BLUNDER = 0, 1, 2, 3
+
+_PHASE_CODES = {"opening": 0, "middlegame": 1, "endgame": 2}
+
+# One row per candidate ply; the rule cascade below runs over whole
+# columns at once instead of re-entering Python per move
+_CLASSIFY_DTYPE = np.dtype([
+    ("cp_before", "i4"),
+    ("cp_after", "i4"),
+    ("regret", "f4"),
+    ("phase", "u1"),
+    ("hanging", "?"),
+    ("mate", "?"),
+    ("forced", "?"),
+    ("obvious", "?"),
+])
+
+
+def classify_blunders(features: np.ndarray) -> np.ndarray:
     """
-    CORE LOGIC: Classify move based on human regret psychology.
-    
+    CORE LOGIC: Classify moves based on human regret psychology.
+
     Philosophy:
     - Blunder = You will kick yourself for this (obvious + severe)
     - Mistake = Clearly wrong, but not catastrophic
     - Inaccuracy = Imprecise, but understandable
     - None = Not worth mentioning
-    
-    Args:
-        regret: Win probability lost (0-100)
-        punishment: Tactical punishment dict
-        game_phase: "opening" | "middlegame" | "endgame"
-        pre_eval: Eval before move
-        post_eval: Eval after move
-    
-    Returns:
-        "blunder" | "mistake" | "inaccuracy" | None
+
+    Takes a _CLASSIFY_DTYPE struct array (one row per candidate ply)
+    and returns severity codes indexing _SEVERITY_LABELS. Rules are
+    applied in descending priority: once a row is settled by a rule,
+    later rules can't change it — mirroring an if/elif cascade, but
+    vectorized over the whole game.
     """
-    
+    severity = np.zeros(len(features), np.uint8)
+    decided = np.zeros(len(features), bool)
+
+    def settle(mask, code):
+        mask &= ~decided
+        severity[mask] = code
+        decided[mask] = True
+
+    regret = features["regret"]
+    pre_eval = features["cp_before"]
+    post_eval = features["cp_after"]
+    eval_swing = pre_eval - post_eval
+
     # ═══════════════════════════════════════════════════════════
     # RULE 0: Suppress trivial regret (noise filter)
     # ═══════════════════════════════════════════════════════════
-    if regret < 2.0:
-        return None  # Not worth mentioning
-    
+    settle(regret < 2.0, _NONE)
+
     # ═══════════════════════════════════════════════════════════
     # RULE 1: Opening suppression (first 10 moves)
+    # Opening has theory flexibility - be very lenient
     # ═══════════════════════════════════════════════════════════
-    if game_phase == "opening":
-        # Opening has theory flexibility - be very lenient
-        if regret < 8.0:
-            return None  # Normal opening imprecision
-        elif regret < 15.0:
-            return "inaccuracy"  # Suboptimal opening choice
-        elif punishment["is_obvious"]:
-            return "blunder"  # Hanging piece in opening is still a blunder
-        else:
-            return "mistake"  # Serious opening error
-    
+    opening = features["phase"] == _PHASE_CODES["opening"]
+    settle(opening & (regret < 8.0), _NONE)  # Normal opening imprecision
+    settle(opening & (regret < 15.0), _INACCURACY)  # Suboptimal opening choice
+    settle(opening & features["obvious"], _BLUNDER)  # Hanging piece still blunders
+    settle(opening, _MISTAKE)  # Serious opening error
+
     # ═══════════════════════════════════════════════════════════
     # RULE 2: BLUNDER detection (catastrophic + obvious)
     # ═══════════════════════════════════════════════════════════
-    
     # 2A: Obvious tactical blunder (hanging piece, mate threat)
-    if punishment["is_obvious"]:
-        if punishment["hanging_piece"] or punishment["mate_threat"]:
-            return "blunder"  # You hung something or allowed mate
-    
+    settle(features["obvious"] & (features["hanging"] | features["mate"]), _BLUNDER)
     # 2B: Massive regret (>20% = catastrophic)
-    if regret > 20.0:
-        return "blunder"
-    
+    settle(regret > 20.0, _BLUNDER)
     # 2C: Eval collapse (single move ruins position)
-    eval_swing = pre_eval - post_eval
-    if eval_swing > 400:  # Lost 4+ pawns equivalent
-        return "blunder"
-    
-    # 2D: From winning to losing
-    if pre_eval > 200 and post_eval < -100:  # +2 to -1
-        return "blunder"
-    
+    settle(eval_swing > 400, _BLUNDER)
+    # 2D: From winning to losing (+2 to -1)
+    settle((pre_eval > 200) & (post_eval < -100), _BLUNDER)
+
     # ═══════════════════════════════════════════════════════════
     # RULE 3: MISTAKE detection (clear error, not catastrophic)
     # ═══════════════════════════════════════════════════════════
-    
-    # 3A: Significant regret (7-20%)
-    if 7.0 < regret <= 20.0:
-        # Check if position meaningfully worsened
-        if eval_swing > 150:  # Lost 1.5+ pawns
-            return "mistake"
-        # Or crossed from advantage to disadvantage
-        if pre_eval > 50 and post_eval < -50:
-            return "mistake"
-    
+    # 3A: Significant regret (7-20%) that meaningfully worsened the
+    # position or crossed from advantage to disadvantage
+    significant = (regret > 7.0) & (regret <= 20.0)
+    settle(
+        significant
+        & ((eval_swing > 150) | ((pre_eval > 50) & (post_eval < -50))),
+        _MISTAKE,
+    )
     # 3B: Moderate regret with forced punishment
-    if regret > 5.0 and punishment["forced_material_loss"]:
-        return "mistake"
-    
-    # ═══════════════════════════════════════════════════════════
-    # RULE 4: INACCURACY detection (imprecise but not terrible)
-    # ═══════════════════════════════════════════════════════════
-    
-    # 4A: Small-medium regret (3-7%)
-    if 3.0 < regret <= 7.0:
-        return "inaccuracy"
-    
+    settle((regret > 5.0) & features["forced"], _MISTAKE)
+
     # ═══════════════════════════════════════════════════════════
-    # DEFAULT: Not a problem
+    # RULE 4: INACCURACY detection (3-7% regret)
     # ═══════════════════════════════════════════════════════════
-    return None
+    settle((regret > 3.0) & (regret <= 7.0), _INACCURACY)
+
+    # Everything still undecided is not a problem
+    return severity
 
 # ─────────────────────────────────────────────────────────────
 # Game Phase Detection
@@ -232,39 +422,40 @@ def detect_game_phase(move_number: int, board: chess.Board) -> str:
     """Determine game phase for context-sensitive classification"""
     if move_number <= 10:
         return "opening"
-    
-    # Count pieces (excluding kings and pawns)
-    pieces = 0
-    for piece_type in [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]:
-        pieces += len(board.pieces(piece_type, chess.WHITE))
-        pieces += len(board.pieces(piece_type, chess.BLACK))
-    
+
+    # Count pieces (excluding kings and pawns): one bitboard OR and a
+    # single popcount instead of eight SquareSet constructions
+    pieces = (
+        board.knights | board.bishops | board.rooks | board.queens
+    ).bit_count()
+
     if pieces <= 6:  # Few pieces left
         return "endgame"
-    
+
     return "middlegame"
 
 # ─────────────────────────────────────────────────────────────
 # Continuation Line (for validation)
 # ─────────────────────────────────────────────────────────────
-def get_punishment_line(board: chess.Board, depth: int = 3) -> str:
-    """Get opponent's best punishment sequence"""
+def get_punishment_line(board: chess.Board, pv: list, depth: int = 3) -> str:
+    """Get opponent's best punishment sequence.
+
+    The principal variation from the position's cached analysis is
+    sliced instead of running any new search.
+    """
+    if not pv:
+        return None
+
     temp_board = board.copy()
     line = []
-    
-    for _ in range(depth):
-        stockfish.set_fen_position(temp_board.fen())
-        best_move = stockfish.get_best_move()
-        if not best_move:
-            break
-        
+
+    for move in pv[:depth]:
         try:
-            move = chess.Move.from_uci(best_move)
             line.append(temp_board.san(move))
             temp_board.push(move)
         except:
             break
-    
+
     return " ".join(line) if line else None
 
 # ─────────────────────────────────────────────────────────────
@@ -273,7 +464,7 @@ def get_punishment_line(board: chess.Board, depth: int = 3) -> str:
 def analyze_pgn(pgn: str, username: str):
     """
     Analyze PGN and return only GENUINE HUMAN BLUNDERS.
-    
+
     Philosophy: Only flag moves that a human will genuinely regret
     when reviewing the game. Ignore engine quibbles and opening theory.
     """
@@ -295,19 +486,112 @@ def analyze_pgn(pgn: str, username: str):
     
     board = game.board()
     problems = []
-    
+
     blunders = 0
     mistakes = 0
     inaccuracies = 0
-    
-    for ply, move in enumerate(game.mainline_moves()):
-        # Only analyze player moves
-        is_player_move = (ply % 2 == 0 and player_is_white) or (ply % 2 == 1 and not player_is_white)
-        
-        if not is_player_move:
+
+    # Player plies sit at every other index; iterating them directly
+    # (replaying the opponent's reply at the top of each pair) avoids
+    # a parity branch on every ply in the passes below
+    moves = list(game.mainline_moves())
+    start = 0 if player_is_white else 1
+
+    # Pass 1: record the zobrist hash and FEN of every position a
+    # player ply needs (before and after the move). Cache keys carry
+    # the POV color alongside the hash because the cached evals are
+    # normalized to the player's perspective.
+    ply_positions = {}
+    all_hashes = []
+    all_fens = []
+
+    scratch = game.board()
+    for ply in range(start, len(moves), 2):
+        move = moves[ply]
+        if ply:
+            scratch.push(moves[ply - 1])
+        pre_hash = chess.polyglot.zobrist_hash(scratch)
+        all_hashes.append(pre_hash)
+        all_fens.append(scratch.fen())
+        scratch.push(move)
+        post_hash = chess.polyglot.zobrist_hash(scratch)
+        all_hashes.append(post_hash)
+        all_fens.append(scratch.fen())
+        ply_positions[ply] = (
+            (pre_hash, player_is_white),
+            (post_hash, player_is_white),
+        )
+
+    # Dedup the hashes in one vectorized pass — repeated positions
+    # collapse to their first occurrence, kept in game order so
+    # neighbouring positions stay on the same worker engine
+    shallow_keys = []
+    shallow_fens = []
+    if all_hashes:
+        _, first_seen = np.unique(
+            np.array(all_hashes, dtype=np.uint64), return_index=True
+        )
+        for i in np.sort(first_seen):
+            key = (all_hashes[i], player_is_white)
+            if not _position_cached(key):
+                shallow_keys.append(key)
+                shallow_fens.append(all_fens[i])
+
+    # Pass 2: shallow search everything in parallel — cheap, but enough
+    # to tell an uneventful ply from a candidate problem
+    _run_batch(shallow_fens, shallow_keys, player_is_white, SHALLOW_DEPTH, _SHALLOW_CACHE)
+
+    # Pass 3: keep only the plies whose rough regret clears the
+    # classifier's own noise floor (RULE 0), then deep-search just those
+    # positions. Quiet plies never pay for a depth-DEPTH search.
+    deep_plies = set()
+    deep_keys = []
+    deep_fens = []
+    deep_seen = set()
+
+    scratch = game.board()
+    for ply in range(start, len(moves), 2):
+        move = moves[ply]
+        if ply:
+            scratch.push(moves[ply - 1])
+        pre_key, post_key = ply_positions[ply]
+        pre_fen = scratch.fen()
+        scratch.push(move)
+        shallow_pre = _CACHE.get(pre_key) or _SHALLOW_CACHE[pre_key]
+        if move == shallow_pre["best_move_obj"] or abs(shallow_pre["cp"]) > 1500:
+            continue
+        shallow_post = _CACHE.get(post_key) or _SHALLOW_CACHE[post_key]
+        if shallow_pre["winprob"] - shallow_post["winprob"] < 2.0:
+            continue
+        deep_plies.add(ply)
+        for key, fen in ((pre_key, pre_fen), (post_key, scratch.fen())):
+            if key in deep_seen or key in _CACHE:
+                continue
+            hit = _disk_get(key, DEPTH)
+            if hit is not None:
+                _CACHE[key] = hit
+                continue
+            deep_seen.add(key)
+            deep_keys.append(key)
+            deep_fens.append(fen)
+
+    # Pass 4: full-depth search for the candidates; the classification
+    # loop below then only sees _CACHE hits
+    _run_batch(deep_fens, deep_keys, player_is_white, DEPTH, _CACHE)
+
+    feature_rows = []
+    candidates = []
+
+    for ply in range(start, len(moves), 2):
+        move = moves[ply]
+        if ply:
+            board.push(moves[ply - 1])
+
+        # Only analyze player moves that survived the shallow prefilter
+        if ply not in deep_plies:
             board.push(move)
             continue
-        
+
         move_num = ply // 2 + 1
         game_phase = detect_game_phase(move_num, board)
         
@@ -315,15 +599,25 @@ def analyze_pgn(pgn: str, username: str):
         # BEFORE move: What was best available?
         # ══════════════════════════════════════════════════════
         pre_eval = get_position_eval(board, player_is_white)
-        pre_board = board.copy()
-        
+
         # ══════════════════════════════════════════════════════
         # CRITICAL CHECK: Did you play the best move?
         # ══════════════════════════════════════════════════════
-        if move.uci() == pre_eval["best_move"]:
+        if move == pre_eval["best_move_obj"]:
             board.push(move)
             continue  # Perfect move - not a problem!
-        
+
+        # Completely won/lost positions can't produce a regret-based
+        # blunder: winprob is saturated, so skip the classification work
+        if abs(pre_eval["cp"]) > 1500:
+            board.push(move)
+            continue
+
+        # SAN needs the pre-move position; capture the strings now so
+        # the board doesn't have to be copied for later formatting
+        played_san = board.san(move)
+        best_san = board.san(pre_eval["best_move_obj"])
+
         # ══════════════════════════════════════════════════════
         # AFTER move: What did you get?
         # ══════════════════════════════════════════════════════
@@ -338,31 +632,44 @@ def analyze_pgn(pgn: str, username: str):
         # ══════════════════════════════════════════════════════
         # Detect tactical punishment (obviousness)
         # ══════════════════════════════════════════════════════
-        punishment = detect_tactical_punishment(
-            pre_board, move, board, player_is_white
-        )
-        
-        # ══════════════════════════════════════════════════════
-        # CLASSIFY using multi-dimensional rules
-        # ══════════════════════════════════════════════════════
-        classification = classify_blunder(
-            regret=regret,
-            punishment=punishment,
-            game_phase=game_phase,
-            pre_eval=pre_eval["cp"],
-            post_eval=post_eval["cp"]
-        )
-        
+        punishment = detect_tactical_punishment(board, player_is_white)
+
         # ══════════════════════════════════════════════════════
-        # If not a problem, skip
+        # Gather features; classification happens vectorized below
         # ══════════════════════════════════════════════════════
-        if classification is None:
+        feature_rows.append((
+            pre_eval["cp"],
+            post_eval["cp"],
+            regret,
+            _PHASE_CODES[game_phase],
+            punishment["hanging_piece"],
+            punishment["mate_threat"] is not None,
+            punishment["forced_material_loss"],
+            punishment["is_obvious"],
+        ))
+        candidates.append({
+            "move_number": move_num,
+            "played_san": played_san,
+            "best_san": best_san,
+            "regret": regret,
+            "pre_eval": pre_eval,
+            "post_eval": post_eval,
+            "punishment": punishment,
+            "game_phase": game_phase,
+            "fen_after": board.fen(),
+        })
+
+    # ══════════════════════════════════════════════════════
+    # CLASSIFY all candidates in one vectorized pass, then
+    # materialize records only for the actual problems
+    # ══════════════════════════════════════════════════════
+    severities = classify_blunders(np.array(feature_rows, dtype=_CLASSIFY_DTYPE))
+
+    for candidate, code in zip(candidates, severities):
+        if code == _NONE:
             continue
-        
-        # ══════════════════════════════════════════════════════
-        # Record the problem
-        # ══════════════════════════════════════════════════════
-        
+        classification = _SEVERITY_LABELS[code]
+
         # Count by severity
         if classification == "blunder":
             blunders += 1
@@ -370,56 +677,69 @@ def analyze_pgn(pgn: str, username: str):
             mistakes += 1
         elif classification == "inaccuracy":
             inaccuracies += 1
-        
+
         # Get punishment line for context
         punishment_line = None
         if classification in ["blunder", "mistake"]:
-            punishment_line = get_punishment_line(board, depth=4)
-        
-        # Format evaluations
-        def format_eval(cp, is_mate, mate_in):
-            if is_mate:
-                sign = "" if cp > 0 else "-"
-                return f"{sign}#{mate_in}"
-            sign = "+" if cp >= 0 else "-"
-            return f"{sign}{abs(cp)/100:.2f}"
-        
-        # Build SAN notation for moves
-        played_san = pre_board.san(move)
-        best_move_obj = chess.Move.from_uci(pre_eval["best_move"])
-        best_san = pre_board.san(best_move_obj)
-        
+            punishment_line = get_punishment_line(
+                chess.Board(candidate["fen_after"]),
+                candidate["post_eval"]["pv"],
+                depth=4,
+            )
+
+        pre_eval = candidate["pre_eval"]
+        post_eval = candidate["post_eval"]
+        punishment = candidate["punishment"]
+
         problems.append({
-            "move_number": move_num,
-            "played": played_san,
-            "best_move": best_san,
-            
+            "move_number": candidate["move_number"],
+            "played": candidate["played_san"],
+            "best_move": candidate["best_san"],
+
             # Classification
             "severity": classification,
-            "regret": round(regret, 1),
-            
+            "regret": round(candidate["regret"], 1),
+
             # Evaluations
             "eval_before": format_eval(pre_eval["cp"], pre_eval["is_mate"], pre_eval["mate_in"]),
             "eval_after": format_eval(post_eval["cp"], post_eval["is_mate"], post_eval["mate_in"]),
-            
+
             # Tactical context
             "hanging_piece": punishment["hanging_piece"],
             "mate_threat": punishment["mate_threat"],
             "forced_loss": punishment["forced_material_loss"],
-            
+
             # Validation
             "punishment_line": punishment_line,
-            
+
             # Context
-            "game_phase": game_phase,
+            "game_phase": candidate["game_phase"],
         })
-    
+
     player = headers.get("White") if player_is_white else headers.get("Black")
     opponent = headers.get("Black") if player_is_white else headers.get("White")
-    
+
+    # Derive game id and timestamp from the headers parsed above, so
+    # callers don't have to re-scan the PGN text for them
+    site = headers.get("Site", "")
+    game_id = site.split("/")[-1] if "/" in site else None
+
+    played_at = None
+    utc_date = headers.get("UTCDate")
+    utc_time = headers.get("UTCTime")
+    if utc_date and utc_time:
+        try:
+            played_at = datetime.strptime(
+                f"{utc_date} {utc_time}", "%Y.%m.%d %H:%M:%S"
+            ).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+
     return {
-    
+
         "game_link": headers.get("Site", "").split("?")[0] if headers.get("Site") else None,
+        "game_id": game_id,
+        "played_at": played_at,
         "player": player,
         "game_mode": headers.get("TimeControl", "unknown"),
         "opponent": opponent,
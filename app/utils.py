@@ -1,104 +1,110 @@
 import json
-import requests
+import re
+import time
 import uuid
 from datetime import datetime
+from functools import lru_cache
+
+from .http import SESSION
 
 
 LICHESS_API = "https://lichess.org/api/games/user"
 
+# Compiled header-tag patterns scan the PGN in C instead of splitting
+# it into a Python line list on every call
+_SITE_RE = re.compile(r'^\[Site "([^"]*)"', re.M)
+_UTCDATE_RE = re.compile(r'^\[UTCDate "([^"]*)"', re.M)
+_UTCTIME_RE = re.compile(r'^\[UTCTime "([^"]*)"', re.M)
+
+
 def extract_game_id_from_pgn(pgn_text: str):
-    for line in pgn_text.splitlines():
-        if line.startswith("[Site "):
-            try:
-                url = line.split('"')[1]
-                return url.split("/")[-1]
-            except:
-                pass
+    m = _SITE_RE.search(pgn_text)
+    if m and m.group(1):
+        return m.group(1).split("/")[-1]
     return str(uuid.uuid4())  # fallback for missing headers
 
 
 def extract_datetime_from_pgn(pgn_text: str):
-    date = None
-    time = "00:00:00"
-
-    for line in pgn_text.splitlines():
-        if line.startswith("[UTCDate "):
-            date = line.split('"')[1]
-        elif line.startswith("[UTCTime "):
-            time = line.split('"')[1]
-
-    if date:
+    date_m = _UTCDATE_RE.search(pgn_text)
+    if date_m:
+        time_m = _UTCTIME_RE.search(pgn_text)
+        time_s = time_m.group(1) if time_m else "00:00:00"
         try:
-            return datetime.fromisoformat(f"{date}T{time}")
-        except:
+            return datetime.fromisoformat(f"{date_m.group(1)}T{time_s}")
+        except ValueError:
             pass
 
     return datetime.utcnow()  # fallback
 
-def lichess_user_exists(username: str) -> bool:
-    r = requests.get(
+_USER_EXISTS_TTL = 300  # seconds
+
+
+@lru_cache(maxsize=1024)
+def _lichess_user_exists(username: str, ttl_bucket: int) -> bool:
+    r = SESSION.get(
         f"https://lichess.org/api/user/{username}",
         timeout=5
     )
     return r.status_code == 200
 
 
+def lichess_user_exists(username: str) -> bool:
+    # ttl_bucket rolls over every _USER_EXISTS_TTL seconds, so repeat
+    # probes (e.g. a user retrying the signup form) skip the API call
+    # while stale answers still expire
+    return _lichess_user_exists(username, int(time.time() // _USER_EXISTS_TTL))
+
+
 def fetch_recent_pgns(username: str, count: int = 5):
     url = f"{LICHESS_API}/{username}"
 
-    params_pgn = {"max": count, "moves": True}
-    params_json = {
+    # pgnInJson embeds the PGN in each NDJSON line, so one streamed
+    # request replaces the old PGN-blob + metadata pair (and the
+    # fragile "\n\n\n" splitting that stitched them together)
+    params = {
         "max": count,
+        "moves": True,
         "pgnInJson": True,
         "clocks": False,
         "evals": False,
         "opening": True,
     }
-
-    headers_pgn = {"Accept": "application/x-chess-pgn"}
-    headers_json = {"Accept": "application/x-ndjson"}
+    headers = {"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"}
 
     try:
-        # Request PGN text blob
-        res_pgn = requests.get(url, params=params_pgn, headers=headers_pgn, timeout=10)
-        if res_pgn.status_code != 200:
-            print("⚠️ PGN fetch failed:", res_pgn.status_code)
-            return []
-
-        pgn_blob = res_pgn.text.strip()
-        raw_pgns = [chunk for chunk in pgn_blob.split("\n\n\n") if "[Event" in chunk]
-
-        if not raw_pgns:
-            print("ℹ️ No PGN games found")
-            return []
-
-        # Request JSON metadata
-        res_json = requests.get(url, params=params_json, headers=headers_json, timeout=10)
-        if res_json.status_code != 200:
-            print("⚠️ Metadata fetch failed:", res_json.status_code)
-            # fallback: still return PGN only
-            return [{"id": None, "createdAt": None, "pgn": pgn} for pgn in raw_pgns[:count]]
+        # The with-block closes the streamed response even when the
+        # early break below leaves it half-read, returning the
+        # connection to the session pool instead of leaking it
+        with SESSION.get(url, params=params, headers=headers, stream=True, timeout=10) as res:
+            if res.status_code != 200:
+                print("⚠️ Game fetch failed:", res.status_code)
+                return []
+
+            games = []
+            for i, line in enumerate(res.iter_lines(decode_unicode=True)):
+                if not line:
+                    continue
+                try:
+                    meta = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # skip corrupted line
+
+                pgn = meta.get("pgn")
+                if not pgn:
+                    continue
 
-        json_lines = res_json.text.strip().splitlines()
-
-        games = []
-        for i, line in enumerate(json_lines):
-            try:
-                meta = json.loads(line)
-            except json.JSONDecodeError:
-                continue  # skip corrupted line
-
-            game_id = meta.get("id")
-            created = meta.get("createdAt")
-
-            if i < len(raw_pgns):
                 games.append({
-                    "id": game_id or f"fallback-{i}",
-                    "createdAt": created,
-                    "pgn": raw_pgns[i]
+                    "id": meta.get("id") or f"fallback-{i}",
+                    "createdAt": meta.get("createdAt"),
+                    "pgn": pgn,
                 })
+                if len(games) >= count:
+                    break
+
+        if not games:
+            print("ℹ️ No PGN games found")
 
-        return games[:count]
+        return games
 
     except Exception as err:
         print("🔥 Unexpected bootstrap error:", err)